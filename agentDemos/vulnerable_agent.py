@@ -8,7 +8,7 @@ from langchain_core.messages import HumanMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 # Add sdk to path to allow importing agentscore without installation
 sys.path.append(str(Path(__file__).resolve().parent.parent / "sdk"))
-from agentscore import AgentScoreCallbackHandler, reset_trace_id, get_trace_id
+from agentscore import AgentScoreCallbackHandler, trace_scope
 
 # Explicitly load .env from sdk/agentscore
 env_path = Path(__file__).resolve().parent.parent / "sdk" / "agentscore" / ".env"
@@ -144,15 +144,15 @@ async def main():
     print("  - 1 model overkill (flash for simple translation)")
     print("  - 1 prompt bloat (~5000 tokens for simple question)")
     
-    reset_trace_id()
     handler = AgentScoreCallbackHandler()
-    trace_id = get_trace_id()
-    print(f"\nSession Trace ID: {trace_id}")
-    print("-" * 60)
-    
-    await run_redundant_calls(handler)
-    await run_model_overkill(handler)
-    await run_prompt_bloat(handler)
+    # Every call in this block shares one Trace ID
+    with trace_scope() as trace_id:
+        print(f"\nSession Trace ID: {trace_id}")
+        print("-" * 60)
+        
+        await run_redundant_calls(handler)
+        await run_model_overkill(handler)
+        await run_prompt_bloat(handler)
     
     print("\n" + "=" * 60)
     print("  DEMO FINISHED")
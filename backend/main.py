@@ -47,10 +47,8 @@ gemini_client = None
 if GEMINI_API_KEY:
     gemini_client = genai.Client(api_key=GEMINI_API_KEY)
 
-@app.post("/events")
-def receive_event(event: EventCreate, background_tasks: BackgroundTasks):
-    """Receives a single AI call event."""
-    
+def prepare_event(event: EventCreate) -> dict:
+    """Serialize an incoming event for Supabase and fill in its cost."""
     event_dict = event.model_dump()
     # Convert UUIDs to strings for JSON serialization/Supabase
     for key, value in event_dict.items():
@@ -59,24 +57,6 @@ def receive_event(event: EventCreate, background_tasks: BackgroundTasks):
         if isinstance(value, UUID):
             event_dict[key] = str(value)
 
-    # Ensure Workflow Exists (Fix for FK Constraint)
-    try:
-        # Check if workflow already exists
-        existing = supabase.table("workflows").select("id").eq("id", event_dict["workflow_id"]).execute()
-        
-        if not existing.data:
-            # First event - create with timestamp name
-            timestamp = datetime.now().strftime("%b %d, %I:%M %p")
-            default_name = f"Workflow - {timestamp}"
-            
-            supabase.table("workflows").insert({
-                "id": event_dict["workflow_id"],
-                "name": default_name,
-                "status": "active"
-            }).execute()
-    except Exception as e:
-        print(f"Warning: Workflow creation failed: {e}")
-            
     # Calculate Cost if missing
     if event_dict.get("cost", 0) == 0 and event_dict.get("model") and event_dict.get("tokens_in") is not None:
         try:
@@ -89,60 +69,113 @@ def receive_event(event: EventCreate, background_tasks: BackgroundTasks):
             pass # Unknown model, keep 0
             
     print(f"DEBUG: Calculated Cost: {event_dict.get('cost')} for model {event_dict.get('model')} (Tokens: {event_dict.get('tokens_in')}/{event_dict.get('tokens_out')})")
+    return event_dict
 
-    # Insert single event
-    # We pop parent_relationships as it's kept in a separate join table
-    parent_relationships = event_dict.pop("parent_relationships", None)
-    data = [event_dict]
-
+def ensure_workflow(workflow_id: str):
+    """Create the workflow row on its first event (Fix for FK Constraint)."""
     try:
-        response = supabase.table("events").insert(data).execute()
-        
-        # Insert Call Edges if provided
-        workflow_id = event_dict["workflow_id"]
-        if parent_relationships:
-            edge_data = []
-            for rel in parent_relationships:
-                edge_data.append({
-                    "workflow_id": workflow_id,
-                    "source_id": rel["parent_id"],
-                    "target_id": event_dict["run_id"],
-                    "overlap_score": rel.get("score", 1.0),
-                    "overlap_type": rel.get("type", "exact")
-                })
-            supabase.table("call_edges").insert(edge_data).execute()
-
-        # Update workflow statistics after event insertion
-        
-        # Aggregate statistics from all events for this workflow
-        events_response = supabase.table("events")\
-            .select("cost, created_at")\
-            .eq("workflow_id", workflow_id)\
-            .execute()
+        # Check if workflow already exists
+        existing = supabase.table("workflows").select("id").eq("id", workflow_id).execute()
         
-        if events_response.data:
-            # Calculate totals
-            total_calls = len(events_response.data)
-            total_cost = sum(float(e.get("cost", 0)) for e in events_response.data)
-            
-            # Get start and end times
-            timestamps = [e["created_at"] for e in events_response.data if e.get("created_at")]
-            start_time = min(timestamps) if timestamps else None
-            end_time = max(timestamps) if timestamps else None
+        if not existing.data:
+            # First event - create with timestamp name
+            timestamp = datetime.now().strftime("%b %d, %I:%M %p")
+            default_name = f"Workflow - {timestamp}"
             
-            # Update workflow with aggregated stats
-            supabase.table("workflows").update({
-                "total_calls": total_calls,
-                "total_cost": total_cost,
-                "start_time": start_time,
-                "end_time": end_time,
+            supabase.table("workflows").insert({
+                "id": workflow_id,
+                "name": default_name,
                 "status": "active"
-            }).eq("id", workflow_id).execute()
+            }).execute()
+    except Exception as e:
+        print(f"Warning: Workflow creation failed: {e}")
+
+def update_workflow_stats(workflow_id: str):
+    """Aggregate statistics from all events for this workflow."""
+    events_response = supabase.table("events")\
+        .select("cost, created_at")\
+        .eq("workflow_id", workflow_id)\
+        .execute()
+    
+    if events_response.data:
+        # Calculate totals
+        total_calls = len(events_response.data)
+        total_cost = sum(float(e.get("cost", 0)) for e in events_response.data)
+        
+        # Get start and end times
+        timestamps = [e["created_at"] for e in events_response.data if e.get("created_at")]
+        start_time = min(timestamps) if timestamps else None
+        end_time = max(timestamps) if timestamps else None
+        
+        # Update workflow with aggregated stats
+        supabase.table("workflows").update({
+            "total_calls": total_calls,
+            "total_cost": total_cost,
+            "start_time": start_time,
+            "end_time": end_time,
+            "status": "active"
+        }).eq("id", workflow_id).execute()
+
+def store_events(event_dicts: List[dict], background_tasks: BackgroundTasks) -> list:
+    """
+    Insert prepared events and their call edges in one request each, then
+    refresh stats and schedule graph computation once per touched workflow.
+    """
+    # We pop parent_relationships as it's kept in a separate join table
+    edge_data = []
+    for event_dict in event_dicts:
+        parent_relationships = event_dict.pop("parent_relationships", None)
+        for rel in parent_relationships or []:
+            edge_data.append({
+                "workflow_id": event_dict["workflow_id"],
+                "source_id": rel["parent_id"],
+                "target_id": event_dict["run_id"],
+                "overlap_score": rel.get("score", 1.0),
+                "overlap_type": rel.get("type", "exact")
+            })
+
+    response = supabase.table("events").insert(event_dicts).execute()
+    
+    # Insert Call Edges if provided
+    if edge_data:
+        supabase.table("call_edges").insert(edge_data).execute()
+
+    # Update workflow statistics after event insertion
+    for workflow_id in dict.fromkeys(e["workflow_id"] for e in event_dicts):
+        update_workflow_stats(workflow_id)
         
         # Trigger Graph Computation
         background_tasks.add_task(compute_workflow_graph_metrics, str(workflow_id), supabase)
 
-        return {"message": "Events logged successfully", "data": response.data}
+    return response.data
+
+@app.post("/events")
+def receive_event(event: EventCreate, background_tasks: BackgroundTasks):
+    """Receives a single AI call event."""
+    event_dict = prepare_event(event)
+    ensure_workflow(event_dict["workflow_id"])
+
+    try:
+        data = store_events([event_dict], background_tasks)
+        return {"message": "Events logged successfully", "data": data}
+    except Exception as e:
+        print(f"Error inserting events: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/events/batch")
+def receive_events_batch(events: List[EventCreate], background_tasks: BackgroundTasks):
+    """Receives a batch of AI call events (as sent by the SDK's background sender)."""
+    if not events:
+        return {"message": "Events logged successfully", "data": []}
+
+    event_dicts = [prepare_event(event) for event in events]
+    for workflow_id in dict.fromkeys(e["workflow_id"] for e in event_dicts):
+        ensure_workflow(workflow_id)
+
+    try:
+        data = store_events(event_dicts, background_tasks)
+        return {"message": "Events logged successfully", "data": data}
     except Exception as e:
         print(f"Error inserting events: {e}")
         traceback.print_exc()
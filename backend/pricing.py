@@ -6,6 +6,9 @@ Prices are per 1M tokens (paid tier, standard processing).
 Last updated: January 2026
 """
 
+from functools import lru_cache
+from typing import Optional, Tuple
+
 MODEL_PRICING = {
     # Google Gemini
     "gemini-3-pro": {"input": 2.00, "output": 12.00},
@@ -46,6 +49,7 @@ MODEL_PRICING = {
 }
 
 
+@lru_cache(maxsize=512)
 def normalize_model_name(model: str) -> str:
     """
     Normalize model names to match pricing table keys.
@@ -60,8 +64,13 @@ def normalize_model_name(model: str) -> str:
     return normalized
 
 
-def calculate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
-    """Calculate cost in USD for a given model and token counts."""
+@lru_cache(maxsize=256)
+def get_model_rates(model: str) -> Optional[Tuple[float, float]]:
+    """
+    Resolve a model to its (input, output) price per single token.
+    The -demo multiplier is folded in, so callers only multiply by token counts.
+    Returns None for unknown models.
+    """
     normalized_model = normalize_model_name(model)
     
     is_demo = False
@@ -70,16 +79,29 @@ def calculate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> fl
         normalized_model = normalized_model.replace("-demo", "")
 
     if normalized_model not in MODEL_PRICING:
-        # Log warning but don't crash - return 0
-        print(f"Warning: Unknown model '{model}' (normalized: '{normalized_model}')")
-        return 0.0
+        return None
     
     pricing = MODEL_PRICING[normalized_model]
     
     # Apply 10,000x multiplier if it's a demo run
     multiplier = 10000.0 if is_demo else 1.0
     
-    input_cost = (pricing["input"] / 1_000_000) * prompt_tokens * multiplier
-    output_cost = (pricing["output"] / 1_000_000) * completion_tokens * multiplier
+    return (
+        (pricing["input"] / 1_000_000) * multiplier,
+        (pricing["output"] / 1_000_000) * multiplier,
+    )
+
+
+def calculate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Calculate cost in USD for a given model and token counts."""
+    rates = get_model_rates(model)
+    if rates is None:
+        # Log warning but don't crash - return 0
+        print(f"Warning: Unknown model '{model}' (normalized: '{normalize_model_name(model)}')")
+        return 0.0
+    
+    input_rate, output_rate = rates
+    input_cost = input_rate * prompt_tokens
+    output_cost = output_rate * completion_tokens
     
-    return round(input_cost + output_cost, 6)
\ No newline at end of file
+    return round(input_cost + output_cost, 6)
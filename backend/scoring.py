@@ -7,9 +7,14 @@ Where Optimized Cost = Total Cost - Total Waste
 Total Waste = Redundancy Waste + Model Overkill Waste + Prompt Bloat Waste
 """
 
-from typing import Dict, Any, List, Optional
-from pricing import calculate_cost, MODEL_PRICING, normalize_model_name
+import logging
+import re
+from bisect import bisect_right
+from collections import Counter, defaultdict, deque
+from typing import Dict, Any, List, Optional, Tuple
+from pricing import calculate_cost
 
+logger = logging.getLogger(__name__)
 
 # Severity weights - HIGH issues count more than LOW issues
 SEVERITY_WEIGHTS = {
@@ -18,6 +23,17 @@ SEVERITY_WEIGHTS = {
     "LOW": 0.3
 }
 
+# Severity labels as Gemini usually spells them, mapped to the canonical key
+# so the common cases skip the .upper() allocation
+SEVERITY_ALIASES = {
+    label: level
+    for level in SEVERITY_WEIGHTS
+    for label in (level, level.lower(), level.title())
+}
+
+# Leading run of digits in a Gemini call_id (e.g. "call_12" -> "12")
+CALL_ID_PATTERN = re.compile(r"^\D*(\d+)")
+
 # Base penalties per issue type (applied with severity weight)
 BASE_PENALTIES = {
     "redundancy": 8,
@@ -25,10 +41,37 @@ BASE_PENALTIES = {
     "prompt_bloat": 2  # per 1000 wasted tokens
 }
 
+# Letter grade bands: below 60 is F, 60-69 D, 70-79 C, 80-89 B, 90+ A
+GRADE_THRESHOLDS = (60, 70, 80, 90)
+GRADE_LETTERS = ("F", "D", "C", "B", "A")
+
+# run_ids per node_type update; keeps the in.(...) filter within URL length limits
+NODE_TYPE_UPDATE_CHUNK = 150
+
+
+def unwrap_findings(value: Any) -> List[Dict]:
+    """Findings arrive either as a bare list or wrapped as {"items": [...]}."""
+    value = value or []
+    if isinstance(value, dict):
+        value = value.get("items", [])
+    return value
+
+
+def normalize_findings(analysis_results: Dict) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    """
+    Extract the (redundancies, overkill, bloat) finding lists from a Gemini analysis.
+    """
+    return (
+        unwrap_findings(analysis_results.get("redundancies") or analysis_results.get("redundant_calls")),
+        unwrap_findings(analysis_results.get("model_overkill")),
+        unwrap_findings(analysis_results.get("prompt_bloat")),
+    )
+
 
 def get_severity_weight(finding: Dict) -> float:
     """Get the severity weight for a finding, defaulting to MEDIUM if not specified."""
-    severity = finding.get("severity", "MEDIUM").upper()
+    severity = finding.get("severity", "MEDIUM")
+    severity = SEVERITY_ALIASES.get(severity) or severity.upper()
     return SEVERITY_WEIGHTS.get(severity, 0.6)
 
 
@@ -85,7 +128,7 @@ def calculate_context_efficiency_score(bloat_items: List[Dict], events: List[Dic
     if not events:
         return 100
     
-    total_actual_tokens = sum(e.get("tokens_in", 0) for e in events)
+    total_actual_tokens = sum([e.get("tokens_in", 0) for e in events])
     
     if total_actual_tokens == 0:
         return 100
@@ -96,14 +139,15 @@ def calculate_context_efficiency_score(bloat_items: List[Dict], events: List[Dic
     for item in bloat_items:
         current = item.get("current_tokens", 0)
         necessary = item.get("estimated_necessary_tokens", 0)
+        waste_percentage = item.get("waste_percentage")
         weight = get_severity_weight(item)
         
         if necessary > 0 and current > necessary:
             waste = current - necessary
             total_weighted_waste += waste * weight
-        elif item.get("waste_percentage"):
+        elif waste_percentage:
             # Use waste_percentage if provided
-            waste = current * (item.get("waste_percentage", 0) / 100)
+            waste = current * (waste_percentage / 100)
             total_weighted_waste += waste * weight
     
     # Score based on weighted efficiency
@@ -126,19 +170,31 @@ def calculate_optimized_context_efficiency(current_efficiency: int, bloat_items:
     return min(100, optimized)
 
 
-def match_call_id_to_event(call_id: str, events: List[Dict]) -> Optional[Dict]:
+def build_run_id_index(events: List[Dict]) -> Dict[str, Dict]:
+    """
+    Map each event's run_id (as a string) to the event.
+    The first event wins on duplicates, matching a front-to-back scan.
+    """
+    return {str(e.get("run_id", "")): e for e in reversed(events)}
+
+
+def match_call_id_to_event(call_id: str, events: List[Dict], run_id_index: Optional[Dict[str, Dict]] = None) -> Optional[Dict]:
     """
     Match Gemini's call_id (e.g., "call_1") to actual event.
     Extracts the number and uses it as 1-based index into events list.
+    
+    Pass a prebuilt run_id_index (see build_run_id_index) when matching many
+    call_ids against the same events to avoid a linear scan per lookup.
     """
-    import re
-    match = re.search(r'(\d+)', call_id)
+    match = CALL_ID_PATTERN.match(call_id)
     if match:
         index = int(match.group(1)) - 1  # Convert to 0-based index
         if 0 <= index < len(events):
             return events[index]
     
     # Fallback: try exact UUID match
+    if run_id_index is not None:
+        return run_id_index.get(call_id)
     for event in events:
         if call_id == str(event.get("run_id", "")):
             return event
@@ -148,37 +204,49 @@ def filter_findings(findings: list, min_confidence: float = 0.7) -> list:
     """Filter out findings below the confidence threshold."""
     return [f for f in findings if f.get("confidence", 0) >= min_confidence]
 
-def calculate_savings_breakdown(analysis_results: dict, events: List[Dict]) -> dict:
+def empty_savings_breakdown() -> dict:
+    """Zero savings, for workflows with no events or no findings."""
+    return {
+        "redundancy_savings": 0.0,
+        "model_fit_savings": 0.0,
+        "context_efficiency_savings": 0.0,
+        "total_savings": 0.0
+    }
+
+def calculate_savings_breakdown(analysis_results: dict, events: List[Dict],
+                                findings: Optional[Tuple[List[Dict], List[Dict], List[Dict]]] = None) -> dict:
     """
     Calculates detailed savings breakdown.
+
+    Pass findings (from normalize_findings) to reuse an already-normalized analysis.
     """
     if not events:
-        return {
-            "score": 100,
-            "grade": "A",
-            "breakdown": {"redundancy_waste": 0, "overkill_waste": 0, "bloat_waste": 0},
-            "sub_scores": {"redundancy": 100, "model_fit": 100, "context_efficiency": 100},
-            "optimized_sub_scores": {"redundancy": 100, "model_fit": 100, "context_efficiency": 100},
-            "optimized_score": 100,
-            "savings_breakdown": {"total_savings": 0},
-            "severity_counts": {"HIGH": 0, "MEDIUM": 0, "LOW": 0},
-            "top_issues": []
-        }
-
-    # 1. Calculate Total Real Cost
-    total_cost = sum(float(e.get("cost", 0)) for e in events)
-    if total_cost == 0:
-        total_cost = 0.000001  # Prevent division by zero
+        return empty_savings_breakdown()
+
+    # 2. Extract Findings
+    if findings is None:
+        findings = normalize_findings(analysis_results)
+    redundancies, overkill, bloat_items = findings
+    
+    # Clean workflows have nothing to price
+    if not (redundancies or overkill or bloat_items):
+        return empty_savings_breakdown()
+
+    run_id_index = build_run_id_index(events)
+    
+    # Findings on the same model and token counts price identically
+    cost_cache: Dict[Tuple[str, int, int], float] = {}
+    def cached_cost(model: str, tokens_in: int, tokens_out: int) -> float:
+        key = (model, tokens_in, tokens_out)
+        if key not in cost_cache:
+            cost_cache[key] = calculate_cost(model, tokens_in, tokens_out)
+        return cost_cache[key]
     
     # Initialize savings accumulators
     redundancy_savings = 0.0
     model_fit_savings = 0.0
     context_efficiency_savings = 0.0
 
-    # 2. Extract Findings
-    redundancies = analysis_results.get("redundancies") or analysis_results.get("redundant_calls") or []
-    if isinstance(redundancies, dict):
-        redundancies = redundancies.get("items", [])
     redundancies = filter_findings(redundancies)
     
     for finding in redundancies:
@@ -188,24 +256,20 @@ def calculate_savings_breakdown(analysis_results: dict, events: List[Dict]) -> d
         # Calculate group savings for injection
         group_savings = 0.0
         
-        # Sum costs of all redundant calls except the first one
-        for i, call_id in enumerate(call_ids):
-            if i > 0:  # Skip the first call (the one we keep)
-                event = match_call_id_to_event(call_id, events)
-                if event:
-                    cost = event.get("cost", 0)
-                    # Weight by confidence for total metric
-                    redundancy_savings += cost * confidence
-                    # Track unweighted for specific finding display
-                    group_savings += cost
+        # Sum costs of all redundant calls except the first one (the one we keep)
+        for call_id in call_ids[1:]:
+            event = match_call_id_to_event(call_id, events, run_id_index)
+            if event:
+                cost = event.get("cost", 0)
+                # Weight by confidence for total metric
+                redundancy_savings += cost * confidence
+                # Track unweighted for specific finding display
+                group_savings += cost
         
         # Inject savings into the finding item for frontend display
         finding["savings"] = f"${group_savings:.2f}"
     
     # 2. Model fit savings: difference between current and recommended model costs
-    overkill = analysis_results.get("model_overkill") or []
-    if isinstance(overkill, dict):
-        overkill = overkill.get("items", [])
     overkill = filter_findings(overkill)
     
     for finding in overkill:
@@ -215,7 +279,7 @@ def calculate_savings_breakdown(analysis_results: dict, events: List[Dict]) -> d
         
         if current_model and recommended_model:
             call_id = finding.get("call_id", "")
-            event = match_call_id_to_event(call_id, events)
+            event = match_call_id_to_event(call_id, events, run_id_index)
             
             if event:
                 tokens_in = event.get("tokens_in", 0)
@@ -227,8 +291,8 @@ def calculate_savings_breakdown(analysis_results: dict, events: List[Dict]) -> d
                 
                 # Calculate cost difference
                 # Calculate costs using standard pricing
-                theoretical_current = calculate_cost(real_current_model, tokens_in, tokens_out)
-                theoretical_recommended = calculate_cost(recommended_model, tokens_in, tokens_out)
+                theoretical_current = cached_cost(real_current_model, tokens_in, tokens_out)
+                theoretical_recommended = cached_cost(recommended_model, tokens_in, tokens_out)
                 
                 # Get the actual recorded cost from the event (which might be inflated for demo)
                 actual_event_cost = float(event.get("cost", 0))
@@ -248,12 +312,7 @@ def calculate_savings_breakdown(analysis_results: dict, events: List[Dict]) -> d
                 finding["savings"] = f"${savings:.2f}"
     
     # 3. Context efficiency savings: cost of unnecessary tokens
-    bloat_items = analysis_results.get("prompt_bloat") or []
-    if isinstance(bloat_items, dict):
-        bloat_items = bloat_items.get("items", [])
     bloat_items = filter_findings(bloat_items)
-    # Rename for consistency with HEAD logic
-    bloat = bloat_items
     
     for item in bloat_items:
         call_id = item.get("call_id", "")
@@ -262,24 +321,20 @@ def calculate_savings_breakdown(analysis_results: dict, events: List[Dict]) -> d
         confidence = item.get("confidence", 0.8)
         
         if current_tokens > necessary_tokens:
-            event = match_call_id_to_event(call_id, events)
+            event = match_call_id_to_event(call_id, events, run_id_index)
             
             if event:
                 model = event.get("model", "")
                 if model:
                     wasted_tokens = current_tokens - necessary_tokens
                     # Use central pricing logic (handles -demo multiplier automatically)
-                    savings = calculate_cost(model, wasted_tokens, 0)
+                    savings = cached_cost(model, wasted_tokens, 0)
                     
                     # Weight by confidence for total
                     context_efficiency_savings += savings * confidence
                     
                     # Inject savings into the finding item
                     item["savings"] = f"${savings:.4f}"
-
-    
-    # 2. Model fit savings: difference between current and recommended model costs
-
     
     return {
         "redundancy_savings": round(redundancy_savings, 6),
@@ -289,7 +344,8 @@ def calculate_savings_breakdown(analysis_results: dict, events: List[Dict]) -> d
     }
 
 
-def extract_severity_counts(analysis_results: Dict) -> Dict[str, int]:
+def extract_severity_counts(analysis_results: Dict,
+                            findings: Optional[Tuple[List[Dict], List[Dict], List[Dict]]] = None) -> Dict[str, int]:
     """
     Count findings by severity level across all categories.
     """
@@ -300,32 +356,28 @@ def extract_severity_counts(analysis_results: Dict) -> Dict[str, int]:
     if summary.get("severity_counts"):
         return summary["severity_counts"]
     
-    # Otherwise, count manually
-    all_findings = []
-    
-    redundancies = analysis_results.get("redundancies") or analysis_results.get("redundant_calls") or []
-    if isinstance(redundancies, dict):
-        redundancies = redundancies.get("items", [])
-    all_findings.extend(redundancies)
-    
-    overkill = analysis_results.get("model_overkill") or []
-    if isinstance(overkill, dict):
-        overkill = overkill.get("items", [])
-    all_findings.extend(overkill)
-    
-    bloat = analysis_results.get("prompt_bloat") or []
-    if isinstance(bloat, dict):
-        bloat = bloat.get("items", [])
-    all_findings.extend(bloat)
+    # Otherwise, count manually; {"items": []} wrappers normalize to empty lists
+    if findings is None:
+        findings = normalize_findings(analysis_results)
+    if not any(findings):
+        return counts
+
+    redundancies, overkill, bloat = findings
+
+    seen = Counter()
+    for findings_list in (redundancies, overkill, bloat):
+        seen.update(
+            SEVERITY_ALIASES.get(sev) or sev.upper()
+            for sev in (f.get("severity", "MEDIUM") for f in findings_list)
+        )
     
-    for f in all_findings:
-        sev = f.get("severity", "MEDIUM").upper()
-        if sev in counts:
-            counts[sev] += 1
+    for sev in counts:
+        counts[sev] = seen[sev]
             
     return counts
 
-def extract_top_issues(analysis_results: Dict, total_waste: float) -> List[str]:
+def extract_top_issues(analysis_results: Dict, total_waste: float,
+                       findings: Optional[Tuple[List[Dict], List[Dict], List[Dict]]] = None) -> List[str]:
     """Generate simple top issues summary."""
     issues = []
     
@@ -335,23 +387,20 @@ def extract_top_issues(analysis_results: Dict, total_waste: float) -> List[str]:
         return summary["top_issues"]
 
     # Fallback generation
-    redundancies = analysis_results.get("redundancies") or []
-    if isinstance(redundancies, dict): redundancies = redundancies.get("items", [])
+    if findings is None:
+        findings = normalize_findings(analysis_results)
+    if not any(findings):
+        return issues
 
-    overkill = analysis_results.get("model_overkill") or []
-    if isinstance(overkill, dict): overkill = overkill.get("items", [])
-
-    bloat = analysis_results.get("prompt_bloat") or []
-    if isinstance(bloat, dict): bloat = bloat.get("items", [])
+    redundancies, overkill, bloat = findings
     
     if len(redundancies) > 0:
         issues.append(f"{len(redundancies)} redundant call(s) detected")
     if len(overkill) > 0:
-        # Find most common current model
-        models = [o.get("current_model", "") for o in overkill]
-        if models:
-            common_model = max(set(models), key=models.count)
-            issues.append(f"{len(overkill)} call(s) using {common_model} for simple tasks — switch to cheaper model")
+        # Find most common current model, ignoring findings that don't name one
+        model_counts = Counter(o.get("current_model") for o in overkill if o.get("current_model"))
+        common_model = model_counts.most_common(1)[0][0] if model_counts else ""
+        issues.append(f"{len(overkill)} call(s) using {common_model} for simple tasks — switch to cheaper model")
     
     if len(bloat) > 0:
         total_waste = sum(
@@ -365,6 +414,10 @@ def extract_top_issues(analysis_results: Dict, total_waste: float) -> List[str]:
 
 
 
+def calculate_letter_grade(score: float) -> str:
+    """Map a 0-100 score to its letter grade."""
+    return GRADE_LETTERS[bisect_right(GRADE_THRESHOLDS, score)]
+
 
 def calculate_efficiency_score(analysis_results: dict, events: Optional[List[Dict]] = None) -> dict:
     """
@@ -375,20 +428,19 @@ def calculate_efficiency_score(analysis_results: dict, events: Optional[List[Dic
     Returns:
         dict with score, grade, breakdown, sub_scores, optimized predictions, and savings
     """
+    # Normalize the finding lists once and share them with every helper below
+    findings = normalize_findings(analysis_results)
+    
     # 1. Calculate Savings Breakdown first (this computes all the waste values)
-    savings_breakdown = calculate_savings_breakdown(analysis_results, events) if events else {
-        "redundancy_savings": 0.0,
-        "model_fit_savings": 0.0,
-        "context_efficiency_savings": 0.0,
-        "total_savings": 0.0
-    }
+    # Skip it entirely when there is nothing to price
+    savings_breakdown = calculate_savings_breakdown(analysis_results, events, findings=findings) if events and any(findings) else empty_savings_breakdown()
     
     total_waste = savings_breakdown["total_savings"]
     
     # 2. Calculate Total Cost
     total_cost = 0.0
     if events:
-        total_cost = sum(float(e.get("cost", 0)) for e in events)
+        total_cost = sum([float(e.get("cost", 0)) for e in events])
     
     if total_cost == 0:
         if total_waste == 0:
@@ -429,12 +481,12 @@ def calculate_efficiency_score(analysis_results: dict, events: Optional[List[Dic
     }
     
     # Extract severity counts and top issues
-    severity_counts = extract_severity_counts(analysis_results)
-    top_issues = extract_top_issues(analysis_results, total_waste)
+    severity_counts = extract_severity_counts(analysis_results, findings)
+    top_issues = extract_top_issues(analysis_results, total_waste, findings)
     
     return {
         "score": efficiency_score,
-        "grade": None,
+        "grade": calculate_letter_grade(efficiency_score),
         "breakdown": {
             "redundancy_waste": round(savings_breakdown["redundancy_savings"], 6),
             "overkill_waste": round(savings_breakdown["model_fit_savings"], 6),
@@ -451,14 +503,138 @@ def calculate_efficiency_score(analysis_results: dict, events: Optional[List[Dic
         "top_issues": top_issues
     }
 
-def compute_workflow_graph_metrics(workflow_id: str, supabase_client):
-    # (Leaving existing graph logic unchanged as it's separate from scoring)
-    # ... [Keep original implementation if needed, or stub it out if we just want scoring]
-    # For brevity in this write_to_file, I will refer to the existence of this function.
-    # In a real replace, I would include it. 
-    # Since I am using write_to_file with Overwrite=True, I MUST INCLUDE THE FULL CONTENT.
-    # So I will copy the graph logic from the previous file view.
+def compute_graph_metrics(events: List[Dict], detected_edges: List[Dict]) -> Tuple[Dict[str, Any], Dict[str, List[str]]]:
+    """
+    Compute dead-branch waste, critical path and information efficiency for a workflow graph.
+    Pure computation, no I/O.
     
+    Returns:
+        (workflow update dict, run_ids grouped by node type)
+    """
+    # 1. Build graph structure
+    # Nodes are numbered once so the graph passes below work on int indices and lists
+    rids = []
+    rid_to_idx = {}
+    latencies = []
+    costs = []
+    created = []
+    for e in events:
+        rid = str(e["run_id"])
+        idx = rid_to_idx.get(rid)
+        if idx is None:
+            idx = rid_to_idx[rid] = len(rids)
+            rids.append(rid)
+            latencies.append(0)
+            costs.append(0.0)
+            created.append(None)
+        latencies[idx] = e.get("latency_ms", 0)
+        costs[idx] = float(e.get("cost", 0))
+        created[idx] = e["created_at"]
+
+    n = len(rids)
+    outbound_counts = [0] * n
+    inbound_counts = [0] * n
+    # Only nodes with edges get adjacency lists
+    adj = defaultdict(list)
+    rev_adj = defaultdict(list)
+    # Parallel edge arrays for the overlap reduction in step 4
+    edge_targets = []
+    edge_overlaps = []
+
+    for edge in detected_edges:
+        tgt_idx = rid_to_idx.get(str(edge["target_id"]))
+        if tgt_idx is not None:
+            edge_targets.append(tgt_idx)
+            edge_overlaps.append(edge.get("overlap_score", 0))
+        src = rid_to_idx.get(str(edge["source_id"]))
+        if src is None or tgt_idx is None:
+            # Dangling edge: one end isn't among this workflow's events
+            continue
+        adj[src].append(tgt_idx)
+        rev_adj[tgt_idx].append(src)
+        outbound_counts[src] += 1
+        inbound_counts[tgt_idx] += 1
+
+    # 2. Identify Dead Branches using Backwards Reachability
+    leaf_nodes = [i for i in range(n) if outbound_counts[i] == 0]
+    leaf_nodes.sort(key=created.__getitem__, reverse=True)
+    
+    intended_output = leaf_nodes[0] if leaf_nodes else None
+    alive = [False] * n
+    
+    if intended_output is not None:
+        queue = deque([intended_output])
+        alive[intended_output] = True
+        while queue:
+            curr = queue.popleft()
+            for p in rev_adj.get(curr, ()):
+                if not alive[p]:
+                    alive[p] = True
+                    queue.append(p)
+
+    dead_branch_waste = sum([costs[i] for i in range(n) if not alive[i]])
+
+    # 3. Critical Path
+    # Longest path over the DAG, relaxing each edge once in topological order
+    dist = list(latencies)
+    parent_map = [None] * n
+    indegree = list(inbound_counts)
+        
+    ready = deque(i for i in range(n) if indegree[i] == 0)
+    visited = 0
+    while ready:
+        src = ready.popleft()
+        visited += 1
+        for tgt in adj.get(src, ()):
+            if dist[tgt] < dist[src] + latencies[tgt]:
+                dist[tgt] = dist[src] + latencies[tgt]
+                parent_map[tgt] = src
+            indegree[tgt] -= 1
+            if indegree[tgt] == 0:
+                ready.append(tgt)
+    
+    if visited < n:
+        # Nodes on a cycle never reach in-degree 0 and keep their own latency
+        logger.warning("Call graph has a cycle; critical path is approximate")
+    
+    critical_path_latency = max(dist) if dist else 0
+    
+    critical = [False] * n
+    if dist:
+        curr = max(range(n), key=dist.__getitem__)
+        while curr is not None:
+            critical[curr] = True
+            curr = parent_map[curr]
+
+    # 4. Info Efficiency
+    total_tokens = sum([e.get("tokens_in", 0) + e.get("tokens_out", 0) for e in events])
+    info_efficiency = 0
+    if total_tokens > 0:
+        useful_score = sum(overlap for tgt, overlap in zip(edge_targets, edge_overlaps) if alive[tgt])
+        info_efficiency = (useful_score * 100) / (len(events) or 1)
+
+    # 5. Metrics to persist on the workflow
+    update_data = {
+        "dead_branch_waste": round(dead_branch_waste, 6),
+        "critical_path_latency": int(critical_path_latency),
+        "information_efficiency": round(float(info_efficiency), 2),
+        "graph_computed": True
+    }
+
+    # Group nodes by type so each type is written in a single request
+    # Indices are mapped back to run_ids only here
+    nodes_by_type = {"normal": [], "dead": [], "critical": []}
+    for i, rid in enumerate(rids):
+        ntype = "normal"
+        if not alive[i]: ntype = "dead"
+        if critical[i]: ntype = "critical"
+        nodes_by_type[ntype].append(rid)
+
+    return update_data, nodes_by_type
+
+
+def compute_workflow_graph_metrics(workflow_id: str, supabase_client):
+    """Fetch a workflow's events and edges, compute graph metrics and persist them."""
     try:
         # 1. Fetch data
         events_res = supabase_client.table("events").select("*").eq("workflow_id", workflow_id).execute()
@@ -469,108 +645,22 @@ def compute_workflow_graph_metrics(workflow_id: str, supabase_client):
         
         if not events: return
         
-        # 2. Build graph structure
-        node_latencies = {}
-        node_costs = {}
-        outbound_counts = {}
-        inbound_counts = {}
-        adj = {}
-        
-        for e in events:
-            rid = str(e["run_id"])
-            node_latencies[rid] = e.get("latency_ms", 0)
-            node_costs[rid] = float(e.get("cost", 0))
-            outbound_counts[rid] = 0
-            inbound_counts[rid] = 0
-            adj[rid] = []
-            
-        for edge in detected_edges:
-            src = str(edge["source_id"])
-            tgt = str(edge["target_id"])
-            if src in adj: 
-                adj[src].append(tgt)
-                outbound_counts[src] += 1
-            if tgt in inbound_counts: 
-                inbound_counts[tgt] += 1
-
-        # 3. Identify Dead Branches using Backwards Reachability
-        leaf_nodes = [rid for rid, count in outbound_counts.items() if count == 0]
-        
-        rid_to_time = {str(e["run_id"]): e["created_at"] for e in events}
-        leaf_nodes.sort(key=lambda rid: rid_to_time[rid], reverse=True)
-        
-        intended_output = leaf_nodes[0] if leaf_nodes else None
-        alive_nodes = set()
-        
-        if intended_output:
-            rev_adj = {rid: [] for rid in node_latencies}
-            for src, targets in adj.items():
-                for tgt in targets:
-                    rev_adj[tgt].append(src)
-            
-            queue = [intended_output]
-            alive_nodes.add(intended_output)
-            while queue:
-                curr = queue.pop(0)
-                for p in rev_adj.get(curr, []):
-                    if p not in alive_nodes:
-                        alive_nodes.add(p)
-                        queue.append(p)
-
-        dead_nodes = [rid for rid in node_latencies if rid not in alive_nodes]
-        dead_branch_waste = sum(node_costs[rid] for rid in dead_nodes)
-
-        # 4. Critical Path
-        dist = {rid: 0 for rid in node_latencies}
-        parent_map = {rid: None for rid in node_latencies}
-        for rid in node_latencies: dist[rid] = node_latencies[rid]
-            
-        for _ in range(len(node_latencies)):
-            for src in adj:
-                for tgt in adj[src]:
-                    if dist[tgt] < dist[src] + node_latencies[tgt]:
-                        dist[tgt] = dist[src] + node_latencies[tgt]
-                        parent_map[tgt] = src
-        
-        critical_path_latency = max(dist.values()) if dist else 0
-        
-        critical_nodes = set()
-        if dist:
-            end_node = max(dist, key=dist.get)
-            curr = end_node
-            while curr:
-                critical_nodes.add(curr)
-                curr = parent_map[curr]
-
-        # 5. Info Efficiency
-        total_tokens = sum(e.get("tokens_in", 0) + e.get("tokens_out", 0) for e in events)
-        info_efficiency = 0
-        if total_tokens > 0:
-            useful_score = sum(edge.get("overlap_score", 0) for edge in detected_edges if str(edge["target_id"]) in alive_nodes)
-            info_efficiency = (useful_score * 100) / (len(events) or 1)
-
-        # 6. Update Database
-        update_data = {
-            "dead_branch_waste": round(dead_branch_waste, 6),
-            "critical_path_latency": int(critical_path_latency),
-            "information_efficiency": round(float(info_efficiency), 2),
-            "graph_computed": True
-        }
+        # 2. Compute metrics
+        update_data, nodes_by_type = compute_graph_metrics(events, detected_edges)
         
+        # 3. Update Database
         supabase_client.table("workflows").update(update_data).eq("id", workflow_id).execute()
         
-        for rid in node_latencies:
-            ntype = "normal"
-            if rid in dead_nodes: ntype = "dead"
-            if rid in critical_nodes: ntype = "critical"
-            try:
-                supabase_client.table("events").update({"node_type": ntype}).eq("run_id", rid).execute()
-            except Exception as e:
-                # Ignore schema errors (project migration might verify pending)
-                # print(f"Warning: Could not update node_type: {e}") 
-                pass
+        for ntype, rids in nodes_by_type.items():
+            for i in range(0, len(rids), NODE_TYPE_UPDATE_CHUNK):
+                chunk = rids[i:i + NODE_TYPE_UPDATE_CHUNK]
+                try:
+                    supabase_client.table("events").update({"node_type": ntype}).in_("run_id", chunk).eq("workflow_id", workflow_id).execute()
+                except Exception as e:
+                    # Keep going: the node_type column may not be migrated yet
+                    logger.warning("Could not update node_type %s for %d events: %s", ntype, len(chunk), e)
 
         return update_data
-    except Exception as e:
-        print(f"Error computing graph metrics: {e}")
+    except Exception:
+        logger.exception("Error computing graph metrics for %s", workflow_id)
         return None
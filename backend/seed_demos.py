@@ -1,21 +1,85 @@
+import os
 import sys
 import json
 import uuid
 import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta, timezone
+from itertools import islice
 import dateutil.parser
 from database import supabase
 
+try:
+    # Optional: orjson parses large snapshots considerably faster
+    import orjson
+except ImportError:
+    orjson = None
+
+# Event chunks are independent, so their inserts can overlap on the network
+INSERT_WORKERS = 8
+
+def parse_iso(value):
+    """Parse an ISO 8601 timestamp, falling back to dateutil for forms fromisoformat rejects."""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return dateutil.parser.isoparse(value)
+
+def uuid4_batch(n):
+    """Generate n random UUID4 strings from a single entropy read."""
+    buf = os.urandom(16 * n)
+    return [str(uuid.UUID(bytes=buf[i:i+16], version=4)) for i in range(0, 16 * n, 16)]
+
+def insert_event_chunk(chunk):
+    supabase.table("events").insert(chunk).execute()
+
+def chunked(iterable, size):
+    """Yield lists of up to size items without materializing the whole iterable."""
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+def shift_events(events_data, parsed_event_times, run_id_map, new_wf_id, time_shift):
+    """Yield each snapshot event re-keyed to the new workflow and shifted in time."""
+    for evt, (created_at, timestamp) in zip(events_data, parsed_event_times):
+        new_evt = {**evt, 'run_id': run_id_map[evt['run_id']], 'workflow_id': new_wf_id}
+        
+        # Update parent_run_id if it exists
+        if new_evt.get('parent_run_id') and new_evt['parent_run_id'] in run_id_map:
+            new_evt['parent_run_id'] = run_id_map[new_evt['parent_run_id']]
+            
+        # Shift timestamps
+        if created_at:
+            new_evt['created_at'] = (created_at + time_shift).isoformat()
+             
+        if timestamp:
+            new_evt['timestamp'] = (timestamp + time_shift).isoformat()
+
+        yield new_evt
+
 def seed_demos(snapshot_file, reset_state=False, count=1):
     print(f"Seeding demo from {snapshot_file} (Count: {count})...")
     
-    with open(snapshot_file, "r") as f:
-        data = json.load(f)
+    if orjson is not None:
+        with open(snapshot_file, "rb") as f:
+            data = orjson.loads(f.read())
+    else:
+        with open(snapshot_file, "r") as f:
+            data = json.load(f)
         
     workflow_data = data["workflow"]
     events_data = data["events"]
     analyses_data = data["analyses"]
     
+    # Parse event timestamps once; each copy only shifts them
+    parsed_event_times = [
+        (
+            parse_iso(evt['created_at']) if evt.get('created_at') else None,
+            parse_iso(evt['timestamp']) if evt.get('timestamp') else None,
+        )
+        for evt in events_data
+    ]
+    
     for i in range(count):
         print(f"\n--- Seeding Copy {i+1}/{count} ---")
         # 1. Calculate Time Shift
@@ -25,12 +89,15 @@ def seed_demos(snapshot_file, reset_state=False, count=1):
             print("Error: Workflow has no created_at or start_time")
             return
 
-        original_start = dateutil.parser.isoparse(original_start_str)
+        original_start = parse_iso(original_start_str)
         now = datetime.now(timezone.utc)
         time_shift = now - original_start
         
+        # One id for the workflow, then one per event and per analysis
+        new_ids = iter(uuid4_batch(1 + len(events_data) + len(analyses_data)))
+        
         # 2. Prepare New Workflow
-        new_wf_id = str(uuid.uuid4())
+        new_wf_id = next(new_ids)
         old_wf_id = workflow_data['id']
         
         print(f"Creating new workflow: {new_wf_id} (was {old_wf_id})")
@@ -47,7 +114,7 @@ def seed_demos(snapshot_file, reset_state=False, count=1):
         # Shift workflow timestamps
         for field in ['created_at', 'start_time', 'end_time']:
             if new_workflow.get(field):
-                dt = dateutil.parser.isoparse(new_workflow[field])
+                dt = parse_iso(new_workflow[field])
                 new_workflow[field] = (dt + time_shift).isoformat()
         
         # Filter out columns that don't exist in the database schema
@@ -65,51 +132,39 @@ def seed_demos(snapshot_file, reset_state=False, count=1):
         
         # Generate map for ALL events first
         for evt in events_data:
-            run_id_map[evt['run_id']] = str(uuid.uuid4())
+            run_id_map[evt['run_id']] = next(new_ids)
             
-        new_events = []
-        for evt in events_data:
-            new_evt = evt.copy()
-            new_evt['run_id'] = run_id_map[evt['run_id']]
-            new_evt['workflow_id'] = new_wf_id
-            
-            # Update parent_run_id if it exists
-            if new_evt.get('parent_run_id') and new_evt['parent_run_id'] in run_id_map:
-                new_evt['parent_run_id'] = run_id_map[new_evt['parent_run_id']]
-            elif new_evt.get('parent_run_id'):
-                 pass 
+        # Stream events in chunks, keeping at most INSERT_WORKERS chunks in flight
+        chunk_size = 100
+        edge_data = []
+        pending = set()
+        new_events = shift_events(events_data, parsed_event_times, run_id_map, new_wf_id, time_shift)
+        with ThreadPoolExecutor(max_workers=INSERT_WORKERS) as executor:
+            for chunk in chunked(new_events, chunk_size):
+                # 3.5 Reconstruct Call Edges (Crucial for dependency graph)
+                for evt in chunk:
+                    if evt.get('parent_run_id'):
+                        edge_data.append({
+                            "workflow_id": new_wf_id,
+                            "source_id": evt['parent_run_id'],
+                            "target_id": evt['run_id'],
+                            "overlap_score": 1.0,  # Default for reconstructed edges
+                            "overlap_type": "exact"
+                        })
                 
-            # Shift timestamps
-            if new_evt.get('created_at'):
-                 dt = dateutil.parser.isoparse(new_evt['created_at'])
-                 new_evt['created_at'] = (dt + time_shift).isoformat()
-                 
-            if new_evt.get('timestamp'):
-                 dt = dateutil.parser.isoparse(new_evt['timestamp'])
-                 new_evt['timestamp'] = (dt + time_shift).isoformat()
-
-            new_events.append(new_evt)
+                if len(pending) >= INSERT_WORKERS:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    # Surface a failed insert here
+                    for future in done:
+                        future.result()
+                pending.add(executor.submit(insert_event_chunk, chunk))
             
-        # Batch insert events
-        chunk_size = 100
-        for i in range(0, len(new_events), chunk_size):
-            chunk = new_events[i:i+chunk_size]
-            supabase.table("events").insert(chunk).execute()
+            for future in pending:
+                future.result()
             
         print("Events inserted.")
 
-        # 3.5 Reconstruct Call Edges (Crucial for dependency graph)
-        edge_data = []
-        for evt in new_events:
-            if evt.get('parent_run_id'):
-                edge_data.append({
-                    "workflow_id": new_wf_id,
-                    "source_id": evt['parent_run_id'],
-                    "target_id": evt['run_id'],
-                    "overlap_score": 1.0,  # Default for reconstructed edges
-                    "overlap_type": "exact"
-                })
-        
+        # Edges reference the events, so they go in once every chunk has landed
         if edge_data:
              supabase.table("call_edges").insert(edge_data).execute()
              print(f"Reconstructed {len(edge_data)} call edges.")
@@ -121,11 +176,11 @@ def seed_demos(snapshot_file, reset_state=False, count=1):
             new_analyses = []
             for ana in analyses_data:
                 new_ana = ana.copy()
-                new_ana['id'] = str(uuid.uuid4())
+                new_ana['id'] = next(new_ids)
                 new_ana['workflow_id'] = new_wf_id
                 
                 if new_ana.get('created_at'):
-                     dt = dateutil.parser.isoparse(new_ana['created_at'])
+                     dt = parse_iso(new_ana['created_at'])
                      new_ana['created_at'] = (dt + time_shift).isoformat()
                      
                 new_analyses.append(new_ana)
@@ -1,5 +1,6 @@
 import sys
 import os
+import pytest
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scoring import (
@@ -8,81 +9,54 @@ from scoring import (
     calculate_redundancy_score,
     calculate_model_fit_score,
     calculate_context_efficiency_score,
-    calculate_savings_breakdown
+    calculate_savings_breakdown,
+    compute_graph_metrics
 )
 
-def test_perfect_score():
-    analysis = {
-        "redundancies": {"items": []},
-        "model_overkill": {"items": []},
-        "prompt_bloat": {"items": []}
-    }
-    result = calculate_efficiency_score(analysis)
-    assert result["score"] == 100
-    assert result["grade"] == "A"
+# Four calls at $0.01 each; the score is the share of that cost not wasted
+FOUR_CALLS = [{"run_id": f"run-{i}", "cost": 0.01} for i in range(4)]
 
-def test_redundancy_penalty():
-    # 2 redundancies = -30 points
-    analysis = {
-        "redundancies": {"items": [{}, {}]},
-        "model_overkill": {"items": []},
-        "prompt_bloat": {"items": []}
-    }
-    result = calculate_efficiency_score(analysis)
-    assert result["score"] == 70
-    assert result["grade"] == "C"
-
-def test_overkill_penalty():
-    # 3 overkills = -30 points
-    analysis = {
+@pytest.mark.parametrize("analysis,events,expected_score,expected_grade", [
+    pytest.param({
         "redundancies": {"items": []},
-        "model_overkill": {"items": [{}, {}, {}]},
+        "model_overkill": {"items": []},
         "prompt_bloat": {"items": []}
-    }
-    result = calculate_efficiency_score(analysis)
-    assert result["score"] == 70
-    assert result["grade"] == "C"
-
-def test_bloat_penalty():
-    # 1000 tokens wasted = -5 points
-    analysis = {
-        "prompt_bloat": {
-            "items": [
-                {"estimated_necessary_tokens": 500, "current_tokens": 1500} # 1000 excess
-            ]
-        }
-    }
-    result = calculate_efficiency_score(analysis)
-    assert result["score"] == 95 # 100 - 5
-    assert result["grade"] == "A"
-
-def test_vulnerable_agent_simulation():
-    # Simulation of a very bad agent
-    # 2 Redundancies (-30), 2 Overkills (-20), 4000 Bloat Tokens (-20)
-    # Total Penalty: -70. Score: 30
-    analysis = {
-        "redundancies": {"items": [{}, {}]},
-        "model_overkill": {"items": [{}, {}]},
-        "prompt_bloat": {
-            "items": [
-                {"estimated_necessary_tokens": 100, "current_tokens": 2100}, # 2000 excess
-                {"estimated_necessary_tokens": 100, "current_tokens": 2100}  # 2000 excess
-            ]
-        }
-    }
-    result = calculate_efficiency_score(analysis)
-    assert result["score"] == 30
-    assert result["grade"] == "F"
+    }, FOUR_CALLS, 100, "A", id="perfect_score"),
+    # 1 repeated call = $0.01 of $0.04 wasted
+    pytest.param({
+        "redundancies": {"items": [{"call_ids": ["call_1", "call_2"], "confidence": 1.0}]}
+    }, FOUR_CALLS, 75, "C", id="redundancy_penalty"),
+    # 2 repeated calls weighted by 0.8 confidence = $0.016 wasted
+    pytest.param({
+        "redundancies": {"items": [{"call_ids": ["call_1", "call_2", "call_3"], "confidence": 0.8}]}
+    }, FOUR_CALLS, 60, "D", id="confidence_weighting"),
+    # Findings below 0.7 confidence are ignored
+    pytest.param({
+        "redundancies": {"items": [{"call_ids": ["call_1", "call_2"], "confidence": 0.5}]}
+    }, FOUR_CALLS, 100, "A", id="low_confidence_ignored"),
+    # Without events there is no cost to price the findings against
+    pytest.param({
+        "redundancies": {"items": [{"call_ids": ["call_1", "call_2"], "confidence": 1.0}]}
+    }, None, 100, "A", id="no_events"),
+    # Ensure score doesn't go below 0 when waste exceeds the recorded cost
+    pytest.param({
+        "redundancies": {"items": [{"call_ids": ["call_1", "call_2", "call_2", "call_2"], "confidence": 1.0}]}
+    }, FOUR_CALLS[:2], 0, "F", id="score_floor"),
+])
+def test_penalty(analysis, events, expected_score, expected_grade):
+    result = calculate_efficiency_score(analysis, events=events)
+    assert result["score"] == expected_score
+    assert result["grade"] == expected_grade
 
-def test_score_floor():
-    # Ensure score doesn't go below 0
-    analysis = {
-        "redundancies": {"items": [{}] * 10}, # -150
-    }
-    result = calculate_efficiency_score(analysis)
-    assert result["score"] == 0
-    assert result["grade"] == "F"
 
+def test_letter_grade_boundaries():
+    assert calculate_letter_grade(0) == "F"
+    assert calculate_letter_grade(59) == "F"
+    assert calculate_letter_grade(60) == "D"
+    assert calculate_letter_grade(70) == "C"
+    assert calculate_letter_grade(89) == "B"
+    assert calculate_letter_grade(90) == "A"
+    assert calculate_letter_grade(100) == "A"
 
 # NEW TESTS FOR SUB-SCORES
 
@@ -265,3 +239,78 @@ def test_full_integration_with_events():
     assert result["optimized_score"] > result["score"]
     
     assert result["savings_breakdown"]["total_savings"] > 0
+
+
+# GRAPH METRICS
+
+def test_compute_graph_metrics():
+    """Test dead-branch waste and critical path on a diamond with an unused side call"""
+    events = [
+        {"run_id": "a", "latency_ms": 100, "cost": 0.01, "created_at": "2026-01-01T00:00:01"},
+        {"run_id": "b", "latency_ms": 300, "cost": 0.01, "created_at": "2026-01-01T00:00:02"},
+        {"run_id": "c", "latency_ms": 50, "cost": 0.01, "created_at": "2026-01-01T00:00:03"},
+        {"run_id": "x", "latency_ms": 5, "cost": 0.25, "created_at": "2026-01-01T00:00:04"},  # output never used
+        {"run_id": "d", "latency_ms": 10, "cost": 0.01, "created_at": "2026-01-01T00:00:05"},
+    ]
+    edges = [
+        {"source_id": "a", "target_id": "b", "overlap_score": 1.0},
+        {"source_id": "a", "target_id": "c", "overlap_score": 1.0},
+        {"source_id": "b", "target_id": "d", "overlap_score": 1.0},
+        {"source_id": "c", "target_id": "d", "overlap_score": 1.0},
+    ]
+
+    update_data, nodes_by_type = compute_graph_metrics(events, edges)
+
+    assert update_data["dead_branch_waste"] == 0.25
+    assert update_data["critical_path_latency"] == 410  # a -> b -> d
+    assert sorted(nodes_by_type["critical"]) == ["a", "b", "d"]
+    assert nodes_by_type["normal"] == ["c"]
+    assert nodes_by_type["dead"] == ["x"]
+
+
+def test_compute_graph_metrics_cycle(caplog):
+    """Test that a cyclic call graph logs a warning and falls back to an approximate critical path"""
+    events = [
+        {"run_id": "a", "latency_ms": 100, "cost": 0.01, "created_at": "2026-01-01T00:00:01"},
+        {"run_id": "b", "latency_ms": 200, "cost": 0.01, "created_at": "2026-01-01T00:00:02"},
+        {"run_id": "c", "latency_ms": 50, "cost": 0.01, "created_at": "2026-01-01T00:00:03"},
+        {"run_id": "d", "latency_ms": 10, "cost": 0.01, "created_at": "2026-01-01T00:00:04"},
+    ]
+    edges = [
+        {"source_id": "a", "target_id": "b", "overlap_score": 1.0},
+        {"source_id": "b", "target_id": "c", "overlap_score": 1.0},
+        {"source_id": "c", "target_id": "b", "overlap_score": 1.0},  # b <-> c cycle
+        {"source_id": "c", "target_id": "d", "overlap_score": 1.0},
+    ]
+
+    with caplog.at_level("WARNING", logger="scoring"):
+        update_data, nodes_by_type = compute_graph_metrics(events, edges)
+
+    assert "cycle" in caplog.text
+    assert update_data["dead_branch_waste"] == 0
+    assert update_data["critical_path_latency"] == 300
+    assert sorted(nodes_by_type["critical"]) == ["a", "b"]
+    assert sorted(nodes_by_type["normal"]) == ["c", "d"]
+    assert nodes_by_type["dead"] == []
+
+
+def test_compute_graph_metrics_dangling_edge():
+    """Test that edges to or from run_ids outside the workflow's events are skipped"""
+    events = [
+        {"run_id": "a", "latency_ms": 100, "cost": 0.01, "created_at": "2026-01-01T00:00:01"},
+        {"run_id": "b", "latency_ms": 200, "cost": 0.01, "created_at": "2026-01-01T00:00:02"},
+        {"run_id": "c", "latency_ms": 50, "cost": 0.01, "created_at": "2026-01-01T00:00:03"},
+    ]
+    edges = [
+        {"source_id": "a", "target_id": "b", "overlap_score": 1.0},
+        {"source_id": "b", "target_id": "c", "overlap_score": 1.0},
+        {"source_id": "c", "target_id": "ghost", "overlap_score": 1.0},  # unknown target
+        {"source_id": "ghost", "target_id": "a", "overlap_score": 1.0},  # unknown source
+    ]
+
+    update_data, nodes_by_type = compute_graph_metrics(events, edges)
+
+    assert update_data["dead_branch_waste"] == 0
+    assert update_data["critical_path_latency"] == 350  # a -> b -> c
+    assert sorted(nodes_by_type["critical"]) == ["a", "b", "c"]
+    assert nodes_by_type["dead"] == []
@@ -1,4 +1,10 @@
-from .callback import AgentScoreCallbackHandler
-from .utils import get_trace_id, set_trace_id, reset_trace_id
+from .utils import get_trace_id, set_trace_id, reset_trace_id, trace_scope
 
-__all__ = ["AgentScoreCallbackHandler", "get_trace_id", "set_trace_id", "reset_trace_id"]
+__all__ = ["AgentScoreCallbackHandler", "get_trace_id", "set_trace_id", "reset_trace_id", "trace_scope"]
+
+def __getattr__(name):
+    # Import the handler (and LangChain with it) only when it is first used
+    if name == "AgentScoreCallbackHandler":
+        from .callback import AgentScoreCallbackHandler
+        return AgentScoreCallbackHandler
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,17 +1,240 @@
+import atexit
 import json
+import logging
 import os
+import queue
 import threading
+import time
 import requests
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 from uuid import UUID
 
 from langchain_core.callbacks import BaseCallbackHandler
-from langchain_core.outputs import ChatGenerationChunk, GenerationChunk, LLMResult
-from langchain_core.agents import AgentAction, AgentFinish
+
+if TYPE_CHECKING:
+    # Only used in annotations; skip loading them at runtime
+    from langchain_core.outputs import LLMResult
 
 from .utils import get_trace_id
 
+try:
+    # Optional: orjson serializes large prompt payloads considerably faster
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_BACKEND_URL = "http://localhost:8000"
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Warnings show without any logging setup; enable per-batch and zero-token
+# diagnostics with logging.getLogger("agentscore").setLevel(logging.DEBUG)
+logger = logging.getLogger("agentscore")
+
+# Token count keys used by different providers, in order of preference
+INPUT_TOKEN_KEYS = ("prompt_tokens", "input_tokens", "input_token_count", "prompt_token_count")
+OUTPUT_TOKEN_KEYS = ("completion_tokens", "output_tokens", "output_token_count", "candidates_token_count")
+
+def _dumps(payload: Any) -> bytes:
+    """Serialize a request body with orjson when available, else the stdlib."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload).encode("utf-8")
+
+def _pick(usage: dict, keys: tuple) -> int:
+    """Return the first non-zero value found under keys, or 0."""
+    for key in keys:
+        value = usage.get(key)
+        if value:
+            return value
+    return 0
+
+def _truncate(text: Any, max_chars: Optional[int]) -> Any:
+    """Keep the head and tail of an oversized string; other values pass through."""
+    if max_chars is None or not isinstance(text, str) or len(text) <= max_chars:
+        return text
+    half = max_chars // 2
+    # Slice the tail by index: text[-0:] would be the whole string
+    return f"{text[:half]}...<truncated {len(text) - 2 * half} chars>...{text[len(text) - half:]}"
+
+def _as_text(value: Any) -> str:
+    """Render a non-string prompt field (content parts, tool calls) as JSON text."""
+    if isinstance(value, str):
+        return value
+    try:
+        return _dumps(value).decode("utf-8")
+    except (TypeError, ValueError):
+        return str(value)
+
+def _allot(sizes: List[int], budget: int) -> List[int]:
+    """Split budget across fields: small ones stay whole, large ones share the rest equally."""
+    allotted = [0] * len(sizes)
+    remaining = budget
+    order = sorted(range(len(sizes)), key=sizes.__getitem__)
+    for done, i in enumerate(order):
+        allotted[i] = min(sizes[i], remaining // (len(order) - done))
+        remaining -= allotted[i]
+    return allotted
+
+def _cap_prompt(messages: List[dict], max_chars: Optional[int]) -> List[dict]:
+    """Truncate message content and additional_kwargs so the prompt fits max_chars in total."""
+    if max_chars is None:
+        return messages
+    fields = [(msg, key) for msg in messages for key in ("content", "additional_kwargs") if key in msg]
+    texts = [_as_text(msg[key]) for msg, key in fields]
+    sizes = [len(text) for text in texts]
+    if sum(sizes) <= max_chars:
+        return messages
+    
+    for (msg, key), text, size, allowed in zip(fields, texts, sizes, _allot(sizes, max_chars)):
+        if size > allowed:
+            # Truncated structured fields are sent as their JSON text
+            msg[key] = _truncate(text, allowed)
+    return messages
+
+# One sender is shared by every handler so creating handlers per request
+# doesn't leak threads, sessions or atexit hooks
+MAX_BATCH = 32
+FLUSH_INTERVAL = 0.2
+# Longest an exiting interpreter waits on an unreachable backend; later events are dropped
+EXIT_FLUSH_TIMEOUT = 5.0
+
+class _EventSender:
+    """Background worker that batches queued events over one keep-alive session."""
+
+    def __init__(self):
+        self._session = requests.Session()
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="agentscore-sender", daemon=True)
+        self._worker.start()
+        atexit.register(self.flush, EXIT_FLUSH_TIMEOUT)
+
+    def submit(self, url: str, timeout: float, event: dict):
+        """Queue an event for url without blocking the caller."""
+        self._queue.put((url, timeout, event))
+
+    def _run(self):
+        """Drain the queue, posting up to MAX_BATCH events per request."""
+        while True:
+            items = [self._queue.get()]
+            # Collect whatever else arrives within the flush window
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(items) < MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            # Handlers may point at different backends
+            batches: Dict[tuple, List[dict]] = {}
+            for url, timeout, event in items:
+                batches.setdefault((url, timeout), []).append(event)
+            try:
+                for (url, timeout), batch in batches.items():
+                    self._post_batch(url, timeout, batch)
+            except Exception as e:
+                # Never let one bad batch stop the sender thread
+                logger.warning("Could not send events: %s", e)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def _post(self, url: str, body: bytes, timeout: float) -> Optional[int]:
+        """POST a serialized body, returning the status code or None if unreachable."""
+        try:
+            response = self._session.post(url, data=body, headers=JSON_HEADERS, timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            logger.warning("Could not reach backend: %s", e)
+            return None
+        return response.status_code
+
+    def _post_batch(self, url: str, timeout: float, batch: List[dict]):
+        """Send a batch of events, falling back to one request per event on failure."""
+        try:
+            body = _dumps(batch)
+        except (TypeError, ValueError) as e:
+            logger.debug("Could not serialize batch, sending events one by one: %s", e)
+            self._post_each(url, timeout, batch)
+            return
+        
+        status = self._post(url, body, timeout)
+        if status in (200, 201):
+            logger.debug("Captured %d event(s)", len(batch))
+        elif status is not None and len(batch) > 1:
+            # Retry individually so one rejected event doesn't drop the rest
+            logger.debug("Backend returned %s, sending events one by one", status)
+            self._post_each(url, timeout, batch)
+        elif status is not None:
+            logger.warning("Backend returned %s", status)
+
+    def _post_each(self, url: str, timeout: float, batch: List[dict]):
+        """Send events individually, dropping only the ones that fail."""
+        for event in batch:
+            try:
+                body = _dumps([event])
+            except (TypeError, ValueError) as e:
+                logger.warning("Could not serialize event: %s", e)
+                continue
+            status = self._post(url, body, timeout)
+            if status is None:
+                # Backend is unreachable; the rest would fail the same way
+                return
+            if status not in (200, 201):
+                logger.warning("Backend returned %s", status)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued event has been sent; returns False if timeout passed first."""
+        with self._queue.all_tasks_done:
+            done = self._queue.all_tasks_done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+            if not done:
+                logger.warning("Event flush timed out with %d event(s) unsent, continuing...",
+                               self._queue.unfinished_tasks)
+        return done
+
+_sender: Optional[_EventSender] = None
+_sender_lock = threading.Lock()
+
+def _get_sender() -> _EventSender:
+    """Return the shared sender, starting it on first use."""
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = _EventSender()
+        return _sender
+
+class _PendingStart:
+    """What on_chat_model_start records for the matching end callback."""
+    __slots__ = ("run_id", "workflow_id", "parent_run_id", "model", "prompt", "start_ns")
+
+    def __init__(self, run_id: str, workflow_id: str, parent_run_id: Optional[str],
+                 model: str, prompt: List[dict], start_ns: int):
+        self.run_id = run_id
+        self.workflow_id = workflow_id
+        self.parent_run_id = parent_run_id
+        self.model = model
+        self.prompt = prompt
+        self.start_ns = start_ns
+
+def _extract_usage(llm_output: dict, first_gen: Any) -> dict:
+    """Find the token usage dict, checking llm_output then the first generation."""
+    # LangChain provides usage info in llm_output
+    token_usage = llm_output.get("token_usage") or {}
+    if token_usage or first_gen is None:
+        return token_usage
+    
+    # Fallback: Check the first generation's message metadata (standard for Chat Models)
+    message = getattr(first_gen, "message", None)
+    if message is not None:
+        token_usage = getattr(message, "usage_metadata", {}) or {}
+        if token_usage:
+            return token_usage
+    
+    # Fallback 2: Check generation_info (Google legacy)
+    gen_info = getattr(first_gen, "generation_info", None) or {}
+    return gen_info.get("usage_metadata") or gen_info.get("token_usage") or {}
+
 class AgentScoreCallbackHandler(BaseCallbackHandler):
     """
     A LangChain Callback Handler that captures LLM interaction data
@@ -21,35 +244,35 @@ class AgentScoreCallbackHandler(BaseCallbackHandler):
     of a single workflow together, even in async environments.
     """
 
-    def __init__(self, backend_url: Optional[str] = None, timeout: int = 10):
+    # Callbacks never block (sending happens on the background worker), so async
+    # agents can run them on the event loop instead of hopping to an executor.
+    # Running inline also keeps get_trace_id() in the agent's own context.
+    run_inline = True
+
+    def __init__(self, backend_url: Optional[str] = None, timeout: int = 10,
+                 max_field_chars: Optional[int] = 32768):
         super().__init__()
-        self.backend_url = backend_url or os.getenv("AGENTSCORE_BACKEND_URL", "http://localhost:8000")
+        # Read at construction, not import: callers often load .env after importing the SDK
+        self.backend_url = backend_url or os.getenv("AGENTSCORE_BACKEND_URL", DEFAULT_BACKEND_URL)
+        self._events_url = f"{self.backend_url}/events/batch"
         self.timeout = timeout
-        self._pending_starts: Dict[str, dict] = {}
-        self._threads: List[threading.Thread] = []
+        # Caps the whole prompt (every message, additional_kwargs included) and the
+        # response at about max_field_chars each, keeping head and tail; None sends them whole
+        self.max_field_chars = max_field_chars
+        self._pending_starts: Dict[UUID, _PendingStart] = {}
+        self._sender = _get_sender()
 
     def _send_event(self, event_data: dict):
-        """Send events to the backend, waiting for completion."""
-        def _send():
-            try:
-                response = requests.post(
-                    f"{self.backend_url}/events",
-                    json=event_data,
-                    timeout=self.timeout
-                )
-                if response.status_code in (200, 201):
-                    print("Capturing Event ...")
-                else:
-                    print(f"Warning: Backend returned {response.status_code}")
-            except requests.exceptions.RequestException as e:
-                print(f"Warning: Could not reach backend: {e}")
-        
-        thread = threading.Thread(target=_send)
-        thread.start()
-        thread.join(timeout=self.timeout)  # Wait for completion
-        
-        if thread.is_alive():
-            print("Warning: Event send timed out, continuing...")
+        """Queue an event for the background sender without blocking the agent."""
+        self._sender.submit(self._events_url, self.timeout, event_data)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued event has been sent; returns False on timeout.
+        Gives up after timeout seconds (defaults to the request timeout).
+        The shared sender also flushes at exit, for at most EXIT_FLUSH_TIMEOUT seconds.
+        """
+        return self._sender.flush(self.timeout if timeout is None else timeout)
 
     def on_chat_model_start(
         self,
@@ -85,20 +308,21 @@ class AgentScoreCallbackHandler(BaseCallbackHandler):
                 if hasattr(msg, "additional_kwargs") and msg.additional_kwargs:
                     msg_dict["additional_kwargs"] = msg.additional_kwargs
                 serialized_messages.append(msg_dict)
+        serialized_messages = _cap_prompt(serialized_messages, self.max_field_chars)
                 
-        self._pending_starts[str(run_id)] = {
-            "run_id": str(run_id),
-            "workflow_id": get_trace_id(),
-            "parent_run_id": str(parent_run_id) if parent_run_id else None,
-            "event_type": "llm_call",
-            "model": model_name,
-            "prompt": serialized_messages, # Capture full structured logs
-            "start_time": datetime.now(),
-        }
+        # Keyed by the UUID itself; it is stringified once for the payload
+        self._pending_starts[run_id] = _PendingStart(
+            run_id=str(run_id),
+            workflow_id=get_trace_id(),
+            parent_run_id=str(parent_run_id) if parent_run_id else None,
+            model=model_name,
+            prompt=serialized_messages, # Capture full structured logs
+            start_ns=time.monotonic_ns(),
+        )
 
     def on_chat_model_end(
         self,
-        result: LLMResult,
+        result: "LLMResult",
         *,
         run_id: UUID,
         parent_run_id: Optional[UUID] = None,
@@ -109,74 +333,39 @@ class AgentScoreCallbackHandler(BaseCallbackHandler):
         Called when the LLM finishes generating a response.
         We capture the output text and token usage/costs here.
         """
-        start_data = self._pending_starts.pop(str(run_id), None)
-        if not start_data:
-            print(f"Warning: No matching start for run_id {run_id}")
+        start_data = self._pending_starts.pop(run_id, None)
+        if start_data is None:
+            logger.warning("No matching start for run_id %s", run_id)
             return
         
-        # LangChain provides usage info in llm_output
-        llm_output = result.llm_output or {}
-        token_usage = llm_output.get("token_usage", {})
-        
-        # Fallback: Check the first generation's message metadata (standard for Chat Models)
-        if not token_usage and result.generations:
-            try:
-                first_gen = result.generations[0][0]
-                if hasattr(first_gen, "message"):
-                    token_usage = getattr(first_gen.message, "usage_metadata", {}) or {}
-            except Exception:
-                pass
-        
-        # Fallback 2: Check generation_info (Google legacy)
-        if not token_usage and result.generations:
-            try:
-                gen_info = result.generations[0][0].generation_info or {}
-                token_usage = gen_info.get("usage_metadata") or gen_info.get("token_usage", {})
-            except IndexError:
-                pass
+        # Index the first generation once; it carries the text and usage fallbacks
+        first_gen = result.generations[0][0] if result.generations and result.generations[0] else None
+        token_usage = _extract_usage(result.llm_output or {}, first_gen)
 
         # Get the actual text response
-        generation_text = ""
-        if result.generations:
-            try:
-                generation_text = result.generations[0][0].text
-            except IndexError:
-                pass
+        generation_text = _truncate(first_gen.text, self.max_field_chars) if first_gen is not None else ""
 
         # Calculate latency
-        latency_ms = int((datetime.now() - start_data["start_time"]).total_seconds() * 1000)
+        latency_ms = (time.monotonic_ns() - start_data.start_ns) // 1_000_000
 
         # Normalize token keys (different providers use different names)
-        tokens_in = (
-            token_usage.get("prompt_tokens") or 
-            token_usage.get("input_tokens") or 
-            token_usage.get("input_token_count") or
-            token_usage.get("prompt_token_count", 0)
-        )
-        tokens_out = (
-            token_usage.get("completion_tokens") or 
-            token_usage.get("output_tokens") or 
-            token_usage.get("output_token_count") or
-            token_usage.get("candidates_token_count", 0)
-        )
+        tokens_in = _pick(token_usage, INPUT_TOKEN_KEYS)
+        tokens_out = _pick(token_usage, OUTPUT_TOKEN_KEYS)
 
-        if tokens_in == 0 and tokens_out == 0:
-            print(f"DEBUG: Zero tokens found. Available keys: {list(token_usage.keys()) if token_usage else 'None'}")
-            # Try to print generation info if available for deeper debug
-            if result.generations:
-                try:
-                    print(f"DEBUG Gen Info: {result.generations[0][0].generation_info}")
-                except:
-                    pass
+        if tokens_in == 0 and tokens_out == 0 and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Zero tokens found. Available keys: %s", list(token_usage.keys()) if token_usage else None)
+            # Log generation info if available for deeper debug
+            if first_gen is not None:
+                logger.debug("Gen Info: %s", first_gen.generation_info)
 
         # Build complete event matching EventCreate schema
         event_data = {
-            "run_id": start_data["run_id"],
-            "workflow_id": start_data["workflow_id"],
-            "parent_run_id": start_data["parent_run_id"],
+            "run_id": start_data.run_id,
+            "workflow_id": start_data.workflow_id,
+            "parent_run_id": start_data.parent_run_id,
             "event_type": "llm_call",
-            "model": start_data["model"],
-            "prompt": start_data["prompt"],
+            "model": start_data.model,
+            "prompt": start_data.prompt,
             "response": generation_text,
             "tokens_in": tokens_in,
             "tokens_out": tokens_out,
@@ -189,7 +378,7 @@ class AgentScoreCallbackHandler(BaseCallbackHandler):
 
     def on_llm_end(
         self,
-        response: LLMResult,
+        response: "LLMResult",
         *,
         run_id: UUID,
         parent_run_id: Optional[UUID] = None,
@@ -203,4 +392,18 @@ class AgentScoreCallbackHandler(BaseCallbackHandler):
             run_id=run_id,
             parent_run_id=parent_run_id,
             **kwargs
-        )
\ No newline at end of file
+        )
+
+    def on_llm_error(
+        self,
+        error: BaseException,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Called instead of an end callback when the LLM call fails.
+        Drop the pending start so failed calls don't accumulate in memory.
+        """
+        self._pending_starts.pop(run_id, None)
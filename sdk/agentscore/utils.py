@@ -1,5 +1,7 @@
 import uuid
+from contextlib import contextmanager
 from contextvars import ContextVar
+from typing import Iterator, Optional
 
 # ContextVar to store the current workflow Trace ID
 # This ensures that all calls within the same async context share the same ID
@@ -27,3 +29,19 @@ def reset_trace_id():
     Resets the Trace ID (generates a new one for the next workflow).
     """
     _trace_id_var.set(str(uuid.uuid4()))
+
+@contextmanager
+def trace_scope(trace_id: Optional[str] = None) -> Iterator[str]:
+    """
+    Runs a block under its own Trace ID, restoring the previous one on exit.
+    Set it in the parent task so child tasks inherit the same ID.
+    
+    Usage:
+        with trace_scope() as trace_id:
+            await agent.ainvoke(...)
+    """
+    token = _trace_id_var.set(trace_id or str(uuid.uuid4()))
+    try:
+        yield _trace_id_var.get()
+    finally:
+        _trace_id_var.reset(token)
@@ -0,0 +1,83 @@
+import sys
+import os
+import json
+import time
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("langchain_core")
+requests = pytest.importorskip("requests")
+
+from agentscore.callback import _EventSender
+
+URL = "http://backend/events/batch"
+
+
+class StubResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class StubSession:
+    """Records each POSTed batch; rejects any batch containing a "bad" event."""
+
+    def __init__(self, delay=0.0, unreachable=False):
+        self.delay = delay
+        self.unreachable = unreachable
+        self.posts = []
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        time.sleep(self.delay)
+        if self.unreachable:
+            self.posts.append(None)
+            raise requests.exceptions.ConnectionError("connection refused")
+        batch = json.loads(data)
+        self.posts.append(batch)
+        return StubResponse(422 if any(event.get("bad") for event in batch) else 201)
+
+
+def make_sender(**kwargs):
+    sender = _EventSender()
+    sender._session = StubSession(**kwargs)
+    return sender
+
+
+def test_events_are_posted_as_one_batch():
+    """Test that events queued together go out in a single request"""
+    sender = make_sender()
+    for i in range(3):
+        sender.submit(URL, 5, {"i": i})
+
+    assert sender.flush(5)
+    assert sender._session.posts == [[{"i": 0}, {"i": 1}, {"i": 2}]]
+
+
+def test_rejected_batch_is_retried_per_event():
+    """Test that only the rejected and unserializable events are dropped"""
+    sender = make_sender()
+    for event in ({"i": 0}, {"bad": True}, {"i": 1}, {"obj": object()}, {"i": 2}):
+        sender.submit(URL, 5, event)
+
+    assert sender.flush(5)
+    delivered = [batch for batch in sender._session.posts if len(batch) == 1 and "i" in batch[0]]
+    assert delivered == [[{"i": 0}], [{"i": 1}], [{"i": 2}]]
+
+
+def test_unreachable_backend_drops_batch():
+    """Test that a network error drops the batch without per-event retries"""
+    sender = make_sender(unreachable=True)
+    for i in range(3):
+        sender.submit(URL, 5, {"i": i})
+
+    assert sender.flush(5)
+    assert len(sender._session.posts) == 1
+
+
+def test_flush_gives_up_after_timeout():
+    """Test that flush returns once the timeout passes even if the backend hangs"""
+    sender = make_sender(delay=1.0)
+    sender.submit(URL, 5, {"i": 0})
+
+    start = time.monotonic()
+    assert sender.flush(0.1) is False
+    assert time.monotonic() - start < 0.5